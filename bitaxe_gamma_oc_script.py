@@ -1,9 +1,20 @@
 import requests
+from requests.adapters import HTTPAdapter
+import re
+import sys
 import time
 import csv
-import statistics
+import threading
+import numpy as np
 from colorama import Fore, Style, init
 
+# Used only when get_miner_stats falls back to a full parse; orjson is picked
+# up if it happens to be installed, otherwise the stdlib parser is used
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
 # Initialize colorama for cross-platform colored terminal output
 init(autoreset=True)
 
@@ -18,6 +29,11 @@ MINER_IP = "192.168.5.206"
 PATCH_URL = f"http://{MINER_IP}/api/system"         # For setting frequency/voltage
 STATS_URL = f"http://{MINER_IP}/api/system/info"    # For reading miner stats
 
+# Shared keep-alive session so every sample reuses the same TCP connection
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+SESSION.headers["Connection"] = "keep-alive"
+
 # --- Overclocking Sweep Ranges ---
 
 # Frequency sweep (MHz)
@@ -32,10 +48,18 @@ CV_STEP = 10             # Step size for voltage
 
 # --- Timing Controls ---
 
-SETTLE_TIME = 180        # Wait time after each setting change (seconds)
-MEASURE_DURATION = 180   # Duration to collect stats (seconds)
+SETTLE_TIME = 180        # Max wait time after each voltage change (seconds)
+FREQ_SETTLE_TIME = 60    # Max wait time when only the frequency changed (seconds)
+MEASURE_DURATION = 180   # Max duration to collect stats (seconds)
 MEASURE_INTERVAL = 1     # Sampling interval (seconds)
 
+# --- Adaptive Settle & Early Stop ---
+
+SETTLE_TOLERANCE = 0.02        # Max relative gap between hashrate and its EMA to count as settled
+SETTLE_STABLE_SAMPLES = 10     # Consecutive settled samples required to stop waiting
+SEM_TARGET = 0.5               # Stop measuring once standard error of the mean drops below this (GH/s)
+SEM_MIN_SAMPLES = 30           # Minimum samples before the standard error check applies
+
 # --- Confirmation Parameters ---
 
 CONFIRM_DURATION = 60    # Time to confirm a stable drop (seconds)
@@ -47,6 +71,7 @@ CONFIRM_ATTEMPTS = 2     # Number of confirmations required
 TEMP_LIMIT = 61                 # Abort if temp exceeds this (°C)
 HASHRATE_TOLERANCE = 0.90       # Allow drop of up to 10% from best
 COEF_VARIATION_THRESHOLD = 0.12 # Reject unstable hashrate samples
+COV_EARLY_ABORT_AFTER = 30      # Stop measuring once unstable after this long (seconds)
 
 # --- Output File ---
 RESULTS_CSV = "bitaxe_tuning_results.csv"
@@ -74,11 +99,18 @@ ICONS = {
     'FREQUENCY': '📡'
 }
 
+# Color + icon prefixes, built once instead of on every message
+_PREFIX = {k: COLORS[k] + ICONS.get(k, '') + ' ' for k in COLORS}
+_SUFFIX = Style.RESET_ALL + '\n'
+
 def colored_print(message, msg_type='INFO', icon=True):
     """Print colored message with optional icon."""
-    color = COLORS.get(msg_type, Fore.WHITE)
-    icon_str = f"{ICONS.get(msg_type, '')} " if icon else ""
-    print(f"{color}{icon_str}{message}{Style.RESET_ALL}", flush=True)
+    if icon:
+        prefix = _PREFIX.get(msg_type) or Fore.WHITE + ICONS.get(msg_type, '') + ' '
+    else:
+        prefix = COLORS.get(msg_type, Fore.WHITE)
+    sys.stdout.write(prefix + message + _SUFFIX)
+    sys.stdout.flush()
 
 # -----------------------
 # Function Definitions
@@ -95,55 +127,176 @@ def set_miner_settings(freq, cv):
     }
     colored_print(f"Patching: URL:{PATCH_URL} freq={freq} MHz, cv={cv} mV...", 'INFO')
     try:
-        response = requests.patch(PATCH_URL, json=payload, timeout=10)
+        response = SESSION.patch(PATCH_URL, json=payload, timeout=10)
         response.raise_for_status()
         colored_print(f"PATCH success: freq={freq}, cv={cv}", 'SUCCESS')
     except requests.exceptions.RequestException as e:
         colored_print(f"PATCH failed: freq={freq}, cv={cv}, error={e}", 'ERROR')
 
+# Byte-level matchers for the two fields we read, so the ~40-field info JSON
+# does not have to be parsed on every sample
+_NUMBER = rb'\s*:\s*(-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)'
+_HASHRATE_RE = re.compile(rb'"hashRate"' + _NUMBER)
+_TEMP_RE = re.compile(rb'"temp"' + _NUMBER)
+
 def get_miner_stats():
     """Send GET request to fetch current hashrate and temperature."""
     try:
-        response = requests.get(STATS_URL, timeout=10)
+        response = SESSION.get(STATS_URL, timeout=10)
         response.raise_for_status()
-        data = response.json()
+        body = response.content
+        hr_match = _HASHRATE_RE.search(body)
+        temp_match = _TEMP_RE.search(body)
+        if hr_match and temp_match:
+            return float(hr_match.group(1)), float(temp_match.group(1))
+        # Missing or non-numeric field: fall back to a full parse
+        data = json_loads(body)
         return float(data.get("hashRate", 0)), float(data.get("temp", 0))
-    except requests.exceptions.RequestException as e:
+    except (requests.exceptions.RequestException, ValueError) as e:
         colored_print(f"GET {STATS_URL} failed: {e}", 'ERROR')
         return None, None
 
+def _next_tick(next_sample, interval):
+    """
+    Advance a fixed sampling schedule by one interval and return
+    (next_sample, delay). Ticks missed during a slow request are skipped
+    rather than fired back to back, so samples stay at least interval apart.
+    """
+    now = time.monotonic()
+    next_sample += interval
+    if next_sample < now:
+        next_sample = now + interval
+    return next_sample, next_sample - now
+
+def wait_to_settle(max_wait, interval):
+    """
+    Wait for the miner to settle after a setting change, polling its hashrate.
+    Returns early once the hashrate stays within SETTLE_TOLERANCE of its EMA
+    for SETTLE_STABLE_SAMPLES consecutive samples, or after max_wait seconds.
+    """
+    ema = None
+    stable = 0
+
+    colored_print(f"Waiting up to {max_wait}s to settle...", 'INFO')
+    next_sample = time.monotonic()
+    for i in range(max_wait // interval):
+        next_sample, delay = _next_tick(next_sample, interval)
+        time.sleep(delay)
+        hr, temp = get_miner_stats()
+        if temp is not None and temp >= TEMP_LIMIT:
+            colored_print(f"Temperature reached {temp}°C while settling.", 'WARNING')
+            return
+
+        if not hr:
+            stable = 0
+            continue
+
+        # The first reading only seeds the EMA; it has nothing to be compared against
+        if ema is None:
+            ema = hr
+            continue
+
+        ema = 0.9 * ema + 0.1 * hr
+        stable = stable + 1 if abs(ema - hr) / ema < SETTLE_TOLERANCE else 0
+        if stable >= SETTLE_STABLE_SAMPLES:
+            colored_print(f"Settled after {(i + 1) * interval}s", 'DEBUG')
+            return
+
+def _sample_worker(hashrates, temps, progress, ready, stop, interval):
+    """
+    Background sampler for measure_hashrate_stats.
+    Fills the preallocated buffers on a fixed schedule, so the HTTP round trip
+    overlaps the interval, then publishes the sample count in progress[0].
+    It is the only writer, so the buffers need no lock.
+    """
+    last_temp = 0
+    next_sample = time.monotonic()
+    for i in range(len(hashrates)):
+        next_sample, delay = _next_tick(next_sample, interval)
+        if stop.wait(delay):
+            return
+        hr, temp = get_miner_stats()
+        hashrates[i] = hr if hr is not None else 0
+        temps[i] = last_temp = temp if temp is not None else last_temp
+        progress[0] = i + 1
+        ready.set()
+
+def _buffer_stats(hashrates, n):
+    """Exact mean and sample stdev of the first n buffered hashrate samples."""
+    if n == 0:
+        return 0.0, 0.0
+    samples = hashrates[:n]
+    std = float(samples.std(ddof=1)) if n > 1 else 0.0
+    return float(samples.mean()), std
+
 def measure_hashrate_stats(duration, interval):
     """
     Measure hashrate for a duration, sampling at the specified interval.
+    Samples are collected on a background thread; mean and variance are
+    accumulated online (Welford) as they arrive, so a clearly unstable run can
+    end early once COV_EARLY_ABORT_AFTER seconds have been sampled, and a
+    stable one once the standard error of the mean reaches SEM_TARGET.
+    The reported figures are reduced once from the sample buffer with NumPy.
     Returns (average, stddev, last temp, aborted).
     """
     steps = duration // interval
-    samples = []
+    min_samples = COV_EARLY_ABORT_AFTER // interval
+    n = 0
+    mean = 0.0
+    m2 = 0.0
     last_temp = 0
 
-    colored_print(f"Measuring for {duration}s (interval: {interval}s)...", 'INFO')
-    for i in range(steps):
-        time.sleep(interval)
-        hr, temp = get_miner_stats()
-        hr = hr if hr is not None else 0
-        temp = temp if temp is not None else last_temp
-
-        samples.append(hr)
-        last_temp = temp
+    hashrates = np.empty(steps, dtype=np.float64)
+    temps = np.empty(steps, dtype=np.float64)
+    progress = [0]
+    ready = threading.Event()
+    stop = threading.Event()
+    worker = threading.Thread(target=_sample_worker, args=(hashrates, temps, progress, ready, stop, interval), daemon=True)
 
-        if (i + 1) % 30 == 0 or i == steps - 1:
-            colored_print(f"Sample {i+1}/{steps}: {ICONS['PROGRESS']} hr={hr:.2f}, {ICONS['TEMP']} temp={temp:.2f}", 'DEBUG')
-
-        if temp >= TEMP_LIMIT:
-            colored_print(f"Temperature reached {temp}°C. Aborting...", 'WARNING')
-            return None, None, temp, True
-
-    avg = sum(samples) / len(samples)
-    std = statistics.stdev(samples) if len(samples) > 1 else 0
-    return avg, std, last_temp, False
-
-def confirm_drop(threshold, attempts, freq, cv, best_hashrate):
-    """Double-confirm hashrate drop before increasing voltage."""
+    colored_print(f"Measuring for {duration}s (interval: {interval}s)...", 'INFO')
+    worker.start()
+    try:
+        while n < steps:
+            ready.wait(interval)
+            ready.clear()
+            alive = worker.is_alive()
+            filled = progress[0]
+            if filled == n and not alive:
+                break
+
+            for i in range(n, filled):
+                hr = float(hashrates[i])
+                temp = float(temps[i])
+
+                n += 1
+                delta = hr - mean
+                mean += delta / n
+                m2 += delta * (hr - mean)
+                last_temp = temp
+
+                if (i + 1) % 30 == 0 or i == steps - 1:
+                    colored_print(f"Sample {i+1}/{steps}: {ICONS['PROGRESS']} hr={hr:.2f}, {ICONS['TEMP']} temp={temp:.2f}", 'DEBUG')
+
+                if temp >= TEMP_LIMIT:
+                    colored_print(f"Temperature reached {temp}°C. Aborting...", 'WARNING')
+                    return None, None, temp, True
+
+                if n > 1 and mean > 0:
+                    std = (m2 / (n - 1)) ** 0.5
+                    if n >= min_samples and std / mean > COEF_VARIATION_THRESHOLD:
+                        colored_print(f"Unstable after {n} samples (coef={std / mean:.2f}), stopping early", 'WARNING')
+                        return (*_buffer_stats(hashrates, n), last_temp, False)
+                    if n >= SEM_MIN_SAMPLES and std / n ** 0.5 < SEM_TARGET:
+                        colored_print(f"Converged after {n} samples (sem={std / n ** 0.5:.2f}), stopping early", 'DEBUG')
+                        return (*_buffer_stats(hashrates, n), last_temp, False)
+    finally:
+        stop.set()
+        worker.join()
+
+    return (*_buffer_stats(hashrates, n), last_temp, False)
+
+def confirm_drop(threshold_hr, attempts, freq, cv):
+    """Double-confirm hashrate drop below threshold_hr before increasing voltage."""
     for attempt in range(1, attempts + 1):
         colored_print(f"Confirming drop ({attempt}/{attempts}) for {ICONS['FREQUENCY']} freq={freq} MHz, {ICONS['VOLTAGE']} cv={cv} mV...", 'INFO')
         avg, std, temp, aborted = measure_hashrate_stats(CONFIRM_DURATION, CONFIRM_INTERVAL)
@@ -153,11 +306,50 @@ def confirm_drop(threshold, attempts, freq, cv, best_hashrate):
         coef = (std / avg) if avg > 0 else 0
         colored_print(f"Confirm #{attempt}: avg={avg:.2f}, stdev={std:.2f}, coef={coef:.2f}", 'RESULT')
 
-        if coef > COEF_VARIATION_THRESHOLD or avg >= best_hashrate * threshold:
+        if coef > COEF_VARIATION_THRESHOLD or avg >= threshold_hr:
             return avg, coef, False
 
     return avg, coef, False
 
+class TuningResults:
+    """
+    Per-configuration results stored column-wise in preallocated NumPy arrays.
+    Every row is also written and flushed to the CSV file as soon as it is added.
+    """
+    FIELDS = ["frequency", "coreVoltage", "hashrate", "temperature", "stdev"]
+
+    def __init__(self, f, capacity):
+        self.file = f
+        self.writer = csv.DictWriter(f, fieldnames=self.FIELDS)
+        self.writer.writeheader()
+        self.freqs = np.empty(capacity, dtype=np.int32)
+        self.cvs = np.empty(capacity, dtype=np.int32)
+        self.hashrates = np.empty(capacity, dtype=np.float64)
+        self.temps = np.empty(capacity, dtype=np.float64)
+        self.stdevs = np.empty(capacity, dtype=np.float64)
+        self.count = 0
+
+    def add(self, freq, cv, hashrate, temp, stdev):
+        """Record one tested configuration."""
+        k = self.count
+        self.freqs[k] = freq
+        self.cvs[k] = cv
+        self.hashrates[k] = hashrate
+        self.temps[k] = temp
+        self.stdevs[k] = stdev
+        self.count = k + 1
+
+        self.writer.writerow(dict(zip(self.FIELDS, (freq, cv, hashrate, temp, stdev))))
+        self.file.flush()
+
+    def best_stable(self):
+        """Index of the highest hashrate within COEF_VARIATION_THRESHOLD, or None."""
+        hrs = self.hashrates[:self.count]
+        stable = (hrs > 0) & (self.stdevs[:self.count] <= COEF_VARIATION_THRESHOLD * hrs)
+        if not stable.any():
+            return None
+        return int(np.flatnonzero(stable)[hrs[stable].argmax()])
+
 # -----------------------
 # Main Tuning Logic
 # -----------------------
@@ -169,8 +361,7 @@ def main():
     current_cv = CV_START
 
     set_miner_settings(current_freq, current_cv)
-    colored_print(f"Waiting {SETTLE_TIME}s to settle...", 'INFO')
-    time.sleep(SETTLE_TIME)
+    wait_to_settle(SETTLE_TIME, MEASURE_INTERVAL)
     
     baseline, std_base, temp, aborted = measure_hashrate_stats(MEASURE_DURATION, MEASURE_INTERVAL)
     if aborted or baseline is None:
@@ -180,73 +371,65 @@ def main():
     best_hashrate = baseline
     colored_print(f"Baseline hashrate: {baseline:.2f} H/s", 'SUCCESS')
 
-    results = [{
-        "frequency": current_freq,
-        "coreVoltage": current_cv,
-        "hashrate": baseline,
-        "temperature": temp,
-        "stdev": std_base
-    }]
-
-    for freq in range(FREQ_START + FREQ_STEP, FREQ_END + 1, FREQ_STEP):
-        colored_print(f"\nTesting {ICONS['FREQUENCY']} freq={freq} MHz at {ICONS['VOLTAGE']} cv={current_cv} mV...", 'INFO')
-        set_miner_settings(freq, current_cv)
-        colored_print(f"Waiting {SETTLE_TIME}s...", 'INFO')
-        time.sleep(SETTLE_TIME)
-
-        avg, std, temp, aborted = measure_hashrate_stats(MEASURE_DURATION, MEASURE_INTERVAL)
-        if aborted:
-            break
-
-        coef = (std / avg) if avg > 0 else 0
-        colored_print(f"Result: avg={avg:.2f}, stdev={std:.2f}, coef={coef:.2f}", 'RESULT')
-
-        # Check for possible undervoltage
-        if coef <= COEF_VARIATION_THRESHOLD and avg < best_hashrate * HASHRATE_TOLERANCE:
-            colored_print("Suspected undervoltage — confirming...", 'WARNING')
-            confirm_avg, confirm_coef, confirm_abort = confirm_drop(HASHRATE_TOLERANCE, CONFIRM_ATTEMPTS, freq, current_cv, best_hashrate)
-
-            if confirm_abort or confirm_avg is None:
-                continue
-
-            if confirm_avg < best_hashrate * HASHRATE_TOLERANCE:
-                colored_print("Confirmed drop — increasing voltage...", 'WARNING')
-                while current_cv < CV_MAX and confirm_avg < best_hashrate * HASHRATE_TOLERANCE:
-                    current_cv += CV_STEP
-                    colored_print(f"Bumping {ICONS['VOLTAGE']} voltage to {current_cv} mV", 'INFO')
-                    set_miner_settings(freq, current_cv)
-                    time.sleep(SETTLE_TIME)
-
-                    confirm_avg, std_temp, temp, aborted_voltage = measure_hashrate_stats(MEASURE_DURATION, MEASURE_INTERVAL)
-                    if aborted_voltage:
-                        break
-
-                    confirm_avg, confirm_coef, confirm_abort = confirm_drop(HASHRATE_TOLERANCE, CONFIRM_ATTEMPTS, freq, current_cv, best_hashrate)
-                    if confirm_abort or confirm_avg is None:
-                        break
-
-        results.append({
-            "frequency": freq,
-            "coreVoltage": current_cv,
-            "hashrate": avg,
-            "temperature": temp,
-            "stdev": std
-        })
-
-        if coef <= COEF_VARIATION_THRESHOLD and avg > best_hashrate:
-            best_hashrate = avg
-            colored_print(f"New best hashrate: {best_hashrate:.2f}", 'SUCCESS')
-
-        if temp >= TEMP_LIMIT:
-            colored_print("Stopping — temp limit reached.", 'WARNING')
-            break
-
-    colored_print("Writing results to CSV...", 'INFO')
-    with open(RESULTS_CSV, "w", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=["frequency", "coreVoltage", "hashrate", "temperature", "stdev"])
-        writer.writeheader()
-        writer.writerows(results)
-
+    # Write each result as soon as it is measured so an interrupted sweep keeps its data
+    colored_print(f"Writing results to {RESULTS_CSV} as they come in", 'INFO')
+    with open(RESULTS_CSV, "w", newline="", buffering=1) as f:
+        results = TuningResults(f, (FREQ_END - FREQ_START) // FREQ_STEP + 1)
+        results.add(current_freq, current_cv, baseline, temp, std_base)
+
+        for freq in range(FREQ_START + FREQ_STEP, FREQ_END + 1, FREQ_STEP):
+            # best_hashrate only changes at the end of an iteration, so the drop threshold is fixed per step
+            threshold_hr = best_hashrate * HASHRATE_TOLERANCE
+            colored_print(f"\nTesting {ICONS['FREQUENCY']} freq={freq} MHz at {ICONS['VOLTAGE']} cv={current_cv} mV...", 'INFO')
+            set_miner_settings(freq, current_cv)
+            # Voltage is unchanged here; frequency-only changes settle much faster
+            wait_to_settle(FREQ_SETTLE_TIME, MEASURE_INTERVAL)
+
+            avg, std, temp, aborted = measure_hashrate_stats(MEASURE_DURATION, MEASURE_INTERVAL)
+            if aborted:
+                break
+
+            coef = (std / avg) if avg > 0 else 0
+            colored_print(f"Result: avg={avg:.2f}, stdev={std:.2f}, coef={coef:.2f}", 'RESULT')
+
+            # Check for possible undervoltage
+            if coef <= COEF_VARIATION_THRESHOLD and avg < threshold_hr:
+                colored_print("Suspected undervoltage — confirming...", 'WARNING')
+                confirm_avg, confirm_coef, confirm_abort = confirm_drop(threshold_hr, CONFIRM_ATTEMPTS, freq, current_cv)
+
+                if confirm_abort or confirm_avg is None:
+                    continue
+
+                if confirm_avg < threshold_hr:
+                    colored_print("Confirmed drop — increasing voltage...", 'WARNING')
+                    while current_cv < CV_MAX and confirm_avg < threshold_hr:
+                        current_cv += CV_STEP
+                        colored_print(f"Bumping {ICONS['VOLTAGE']} voltage to {current_cv} mV", 'INFO')
+                        set_miner_settings(freq, current_cv)
+                        wait_to_settle(SETTLE_TIME, MEASURE_INTERVAL)
+
+                        confirm_avg, std_temp, temp, aborted_voltage = measure_hashrate_stats(MEASURE_DURATION, MEASURE_INTERVAL)
+                        if aborted_voltage:
+                            break
+
+                        confirm_avg, confirm_coef, confirm_abort = confirm_drop(threshold_hr, CONFIRM_ATTEMPTS, freq, current_cv)
+                        if confirm_abort or confirm_avg is None:
+                            break
+
+            results.add(freq, current_cv, avg, temp, std)
+
+            if coef <= COEF_VARIATION_THRESHOLD and avg > best_hashrate:
+                best_hashrate = avg
+                colored_print(f"New best hashrate: {best_hashrate:.2f}", 'SUCCESS')
+
+            if temp >= TEMP_LIMIT:
+                colored_print("Stopping — temp limit reached.", 'WARNING')
+                break
+
+    best = results.best_stable()
+    if best is not None:
+        colored_print(f"Best stable config: {ICONS['FREQUENCY']} {results.freqs[best]} MHz @ {ICONS['VOLTAGE']} "
+                      f"{results.cvs[best]} mV: {results.hashrates[best]:.2f} (stdev: {results.stdevs[best]:.2f})", 'RESULT')
     colored_print(f"Done! Results saved to {RESULTS_CSV}", 'SUCCESS')
 
 # -----------------------